@@ -0,0 +1,276 @@
+"""Incremental rolling-statistics and EWMA anomaly flags for KPI series.
+
+Every numeric column of every workbook sheet is tracked as a monthly
+series overall, per department and per process. Counts and amounts are
+summed per month, rates and scores averaged. A series is only scored
+once a full window of history exists, and a point is flagged only when
+both the rolling and the EWMA z-score exceed the threshold. The state for each
+series (recent window, EWMA mean/variance, last flag) is persisted as
+JSON together with a per-sheet watermark, so an update only aggregates
+and scores the months that arrived since the previous run.
+
+The CLI is the only writer of that state (run it from cron when a new
+month lands). The dashboard reads it and catches up in memory, without
+saving, when it is missing or behind the workbook. On the first run, or
+after a params change, only flags for each sheet's latest month are
+reported so the backfill does not alert on history.
+
+Headless/alerting usage:
+
+    python anomalies.py                      # update state, print new flags
+    python anomalies.py --json --fail-on-anomaly
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+
+import pandas as pd
+
+DEFAULT_EXCEL_FILE = 'COO_ROI_Dashboard_KPIs_Complete_12.xlsx'
+DEFAULT_STATE_FILE = '.anomaly_state.json'
+DEFAULT_PARAMS = {
+    'window': 12,         # months in the rolling window; also the history needed before scoring
+    'ewma_alpha': 0.1,    # smoothing factor for the EWMA mean/variance
+    'z_threshold': 3.5,   # |z| above which a point is flagged; ~0.3% of points on Gaussian noise
+    'std_floor': 0.05,    # minimum stddev as a fraction of |mean|, so flat series can still flag
+}
+PERIOD_COL = 'Month'
+PROCESS_COLS = ['Process', 'Process_Name']
+# Yes/No flag columns are tracked as the number of "Yes" rows
+FLAG_VALUES = {'Yes': 1.0, 'No': 0.0}
+# Columns named like counts or amounts are summed per month unless they
+# also look like a rate, average or score
+SUM_TOKENS = ('Count', 'Dollars', 'Cost', 'Volume', 'Transactions', 'Hours_Saved')
+MEAN_TOKENS = ('Percentage', 'Rate', 'Per_', 'Avg', 'Score', 'Index')
+STD_EPSILON = 1e-9
+
+# ==================== STATE ====================
+def new_state(params=None):
+    """Create an empty anomaly state"""
+    return {'params': dict(params or DEFAULT_PARAMS), 'watermarks': {}, 'series': {}}
+
+def load_state(path=DEFAULT_STATE_FILE, params=None):
+    """Load persisted state, starting over if missing or built with other params"""
+    params = dict(params or DEFAULT_PARAMS)
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return new_state(params)
+    if state.get('params') != params:
+        return new_state(params)
+    return state
+
+def save_state(state, path=DEFAULT_STATE_FILE):
+    """Atomically write state so concurrent readers never see a partial file"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f, allow_nan=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+def series_key(sheet, metric, dimension, group):
+    return f"{sheet}|{metric}|{dimension}|{group}"
+
+# ==================== AGGREGATION ====================
+def _normalize_periods(periods):
+    return pd.to_datetime(periods.astype(str)).dt.strftime('%Y-%m-%d')
+
+def metric_aggregation(metric, flag_cols=()):
+    """Return 'sum' for count/amount metrics and 'mean' for everything else"""
+    if metric in flag_cols:
+        return 'sum'
+    if any(t in metric for t in SUM_TOKENS) and not any(t in metric for t in MEAN_TOKENS):
+        return 'sum'
+    return 'mean'
+
+def aggregate_new_points(df, watermark=None):
+    """Aggregate rows after the watermark into a long frame of series points.
+
+    Returns columns: period, dimension, group, metric, value.
+    """
+    if PERIOD_COL not in df.columns or df.empty:
+        return pd.DataFrame(columns=['period', 'dimension', 'group', 'metric', 'value'])
+
+    df = df.copy()
+    df['_period'] = _normalize_periods(df[PERIOD_COL])
+    if watermark is not None:
+        df = df[df['_period'] > watermark]
+
+    flag_cols = []
+    for col in df.columns:
+        values = df[col].dropna()
+        if not pd.api.types.is_numeric_dtype(df[col]) and not values.empty and values.isin(FLAG_VALUES.keys()).all():
+            df[col] = df[col].map(FLAG_VALUES)
+            flag_cols.append(col)
+    metrics = [c for c in df.columns
+               if c != PERIOD_COL and pd.api.types.is_numeric_dtype(df[c])]
+    sum_metrics = [c for c in metrics if metric_aggregation(c, flag_cols) == 'sum']
+    mean_metrics = [c for c in metrics if c not in sum_metrics]
+
+    dimensions = [('All', None)]
+    if 'Department' in df.columns:
+        dimensions.append(('Department', 'Department'))
+    dimensions.extend(('Process', c) for c in PROCESS_COLS if c in df.columns)
+
+    frames = []
+    for dimension, group_col in dimensions:
+        keys = ['_period'] if group_col is None else [group_col, '_period']
+        grouped = df.groupby(keys)
+        agg = pd.concat([grouped[sum_metrics].sum(min_count=1), grouped[mean_metrics].mean()], axis=1)
+        if group_col is None:
+            agg.index = pd.MultiIndex.from_arrays([['All'] * len(agg), agg.index])
+        # Groups with no values for a metric in a month produce no point
+        long = agg.stack().dropna().rename('value').reset_index()
+        long.columns = ['group', 'period', 'metric', 'value']
+        long['dimension'] = dimension
+        frames.append(long)
+    points = pd.concat(frames, ignore_index=True)
+    return points.sort_values('period', kind='stable')[['period', 'dimension', 'group', 'metric', 'value']]
+
+# ==================== SCORING ====================
+def _z_score(value, mean, std, std_floor):
+    """Z-score with the stddev floored relative to the mean"""
+    std = max(std, std_floor * abs(mean), STD_EPSILON)
+    return (value - mean) / std
+
+def _window_stats(window):
+    n = len(window)
+    mean = sum(window) / n
+    var = sum((v - mean) ** 2 for v in window) / (n - 1) if n > 1 else 0.0
+    return mean, var
+
+def update_series(series, value, period, params):
+    """Score one new point against the series state, then fold it in"""
+    window = series['window']
+    flag = None
+
+    # Score only once a full window exists; the EWMA is seeded from it
+    if series['count'] >= params['window']:
+        rolling_mean, rolling_var = _window_stats(window)
+        rolling_z = _z_score(value, rolling_mean, math.sqrt(rolling_var), params['std_floor'])
+        ewma_z = _z_score(value, series['ewma_mean'], math.sqrt(series['ewma_var']), params['std_floor'])
+        if min(abs(rolling_z), abs(ewma_z)) > params['z_threshold']:
+            flag = {
+                'period': period,
+                'value': value,
+                'rolling_mean': rolling_mean,
+                'rolling_z': rolling_z,
+                'ewma_mean': series['ewma_mean'],
+                'ewma_z': ewma_z,
+                'direction': 'up' if value > rolling_mean else 'down',
+            }
+
+    if series['count'] >= params['window']:
+        diff = value - series['ewma_mean']
+        increment = params['ewma_alpha'] * diff
+        series['ewma_mean'] += increment
+        series['ewma_var'] = (1 - params['ewma_alpha']) * (series['ewma_var'] + diff * increment)
+    window.append(value)
+    del window[:-params['window']]
+    series['count'] += 1
+    if series['count'] == params['window']:
+        series['ewma_mean'], series['ewma_var'] = _window_stats(window)
+    series['last_period'] = period
+    series['last_flag'] = flag
+    return flag
+
+def update_state(state, sheets):
+    """Fold new periods of each sheet into the state and return new flags.
+
+    A sheet seen for the first time is backfilled silently: only flags on
+    its latest month are returned.
+    """
+    params = state['params']
+    new_flags = []
+    for sheet, df in sheets.items():
+        watermark = state['watermarks'].get(sheet)
+        points = aggregate_new_points(df, watermark)
+        if points.empty:
+            continue
+        latest_period = points['period'].max()
+        for period, dimension, group, metric, value in points.itertuples(index=False, name=None):
+            if not math.isfinite(value):
+                continue
+            key = series_key(sheet, metric, dimension, group)
+            series = state['series'].setdefault(key, {
+                'window': [], 'count': 0, 'ewma_mean': 0.0, 'ewma_var': 0.0,
+                'last_period': None, 'last_flag': None,
+            })
+            flag = update_series(series, float(value), period, params)
+            if flag is not None and (watermark is not None or period == latest_period):
+                new_flags.append(dict(flag, sheet=sheet, metric=metric, dimension=dimension, group=str(group)))
+        state['watermarks'][sheet] = latest_period
+    return new_flags
+
+def current_flags(state):
+    """Return flags raised on the latest processed point of each series"""
+    flags = []
+    for key, series in state['series'].items():
+        if series['last_flag'] is None:
+            continue
+        sheet, metric, dimension, group = key.split('|', 3)
+        if series['last_period'] != state['watermarks'].get(sheet):
+            continue
+        flags.append(dict(series['last_flag'], sheet=sheet, metric=metric, dimension=dimension, group=group))
+    return flags
+
+def peek_current_flags(excel_file=DEFAULT_EXCEL_FILE, state_file=DEFAULT_STATE_FILE, params=None):
+    """Return (flags, stale, scored) without writing state.
+
+    Months the persisted state has not seen yet are folded in memory;
+    ``stale`` is True when that was needed, i.e. the CLI has not run since
+    the workbook last changed. ``scored`` is False while no series has a
+    full window of history yet.
+    """
+    sheets = pd.read_excel(excel_file, sheet_name=None)
+    state = load_state(state_file, params)
+    watermarks = dict(state['watermarks'])
+    update_state(state, sheets)
+    scored = any(s['count'] > state['params']['window'] for s in state['series'].values())
+    return current_flags(state), state['watermarks'] != watermarks, scored
+
+def refresh_flags(excel_file=DEFAULT_EXCEL_FILE, state_file=DEFAULT_STATE_FILE, params=None):
+    """Read the workbook, update persisted state and return (new_flags, state)"""
+    sheets = pd.read_excel(excel_file, sheet_name=None)
+    state = load_state(state_file, params)
+    new_flags = update_state(state, sheets)
+    save_state(state, state_file)
+    return new_flags, state
+
+# ==================== CLI ====================
+def format_flag(flag):
+    return (f"[{flag['period']}] {flag['sheet']} / {flag['metric']} "
+            f"({flag['dimension']}: {flag['group']}) = {flag['value']:.2f} {flag['direction']} "
+            f"(rolling z={flag['rolling_z']:+.1f}, EWMA z={flag['ewma_z']:+.1f})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update KPI anomaly state and report new flags")
+    parser.add_argument('--excel-file', default=DEFAULT_EXCEL_FILE, help="Source workbook")
+    parser.add_argument('--state-file', default=DEFAULT_STATE_FILE, help="Persisted anomaly state")
+    parser.add_argument('--current', action='store_true',
+                        help="Report flags on the latest period instead of only newly processed points")
+    parser.add_argument('--json', action='store_true', help="Print flags as JSON")
+    parser.add_argument('--fail-on-anomaly', action='store_true', help="Exit with status 2 when any flag is reported")
+    args = parser.parse_args(argv)
+
+    new_flags, state = refresh_flags(args.excel_file, args.state_file)
+    flags = current_flags(state) if args.current else new_flags
+
+    if args.json:
+        print(json.dumps(flags, indent=2))
+    else:
+        for flag in flags:
+            print(format_flag(flag))
+        print(f"{len(flags)} anomaly flag(s)")
+    return 2 if flags and args.fail_on_anomaly else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""Chunked export of dashboard slices to CSV, Parquet and Excel.
+
+Used by the Streamlit download buttons, which only export the in-memory
+slice on screen, and runnable as a CLI for full sheets of any length:
+
+    python exports.py role_reality_latest -o latest.xlsx
+    python exports.py role_cost_breakdown -o role_cost.csv   # latest month
+    python exports.py sheet --sheet Collaboration_Overload -o overload.parquet
+
+Rows are read from the workbook and written to the target in fixed-size
+chunks so that memory stays flat regardless of history length.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import numpy as np
+
+DEFAULT_EXCEL_FILE = 'COO_ROI_Dashboard_KPIs_Complete_12.xlsx'
+DEFAULT_CHUNKSIZE = 50_000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+# Opportunity cost column in the mock data and in the workbook, in that order
+OPPORTUNITY_COST_COLS = ['Opportunity_Cost_Monthly', 'Opportunity_Cost_Dollars']
+
+# ==================== READING ====================
+def iter_sheet_chunks(excel_file, sheet_name, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield a sheet as DataFrame chunks using openpyxl's read-only mode"""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(excel_file, read_only=True, data_only=True)
+    try:
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(c) for c in header]
+
+        buffer = []
+        for row in rows:
+            buffer.append(row)
+            if len(buffer) >= chunksize:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        wb.close()
+
+def iter_frame_chunks(df, chunksize=DEFAULT_CHUNKSIZE):
+    """Yield an in-memory DataFrame as row slices"""
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start:start + chunksize]
+
+# ==================== VIEWS ====================
+def iter_latest_month(chunk_source, month_col='Month'):
+    """Yield only the rows of the latest month, scanning the source twice"""
+    latest = None
+    for chunk in chunk_source():
+        if month_col in chunk.columns and not chunk.empty:
+            chunk_max = chunk[month_col].max()
+            latest = chunk_max if latest is None else max(latest, chunk_max)
+    if latest is None:
+        return
+    for chunk in chunk_source():
+        latest_rows = chunk[chunk[month_col] == latest]
+        if not latest_rows.empty:
+            yield latest_rows
+
+def role_cost_breakdown(chunks, group_col='Role'):
+    """Sum opportunity cost per role, as on the Opportunity Cost by Role chart"""
+    total = None
+    cost_col = OPPORTUNITY_COST_COLS[0]
+    for chunk in chunks:
+        chunk_cost_col = next((c for c in OPPORTUNITY_COST_COLS if c in chunk.columns), None)
+        if group_col not in chunk.columns or chunk_cost_col is None:
+            continue
+        cost_col = chunk_cost_col
+        partial = chunk.groupby(group_col)[cost_col].sum()
+        total = partial if total is None else total.add(partial, fill_value=0)
+    if total is None:
+        return pd.DataFrame(columns=[group_col, cost_col])
+    return total.rename(cost_col).sort_values(ascending=False).reset_index()
+
+# ==================== WRITING ====================
+def _write_csv(chunks, fileobj):
+    header = True
+    for chunk in chunks:
+        fileobj.write(chunk.to_csv(index=False, header=header).encode('utf-8'))
+        header = False
+
+def _widen_parquet_field(pa, field):
+    if pa.types.is_null(field.type):
+        return field.with_type(pa.string())
+    if pa.types.is_integer(field.type):
+        return field.with_type(pa.float64())
+    return field
+
+def _write_parquet(chunks, fileobj):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    writer = None
+    try:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                # Later chunks may hold floats or values where this one has whole
+                # numbers or only None, so widen ints and type null columns as strings
+                schema = pa.schema([_widen_parquet_field(pa, field) for field in table.schema])
+                writer = pq.ParquetWriter(fileobj, schema)
+            writer.write_table(table.cast(writer.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _xlsx_value(value):
+    """Convert numpy/pandas scalars into types openpyxl can store"""
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value
+
+def _write_xlsx(chunks, fileobj, sheet_name='Export'):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name[:31])
+    header_written = False
+    for chunk in chunks:
+        if not header_written:
+            ws.append([str(c) for c in chunk.columns])
+            header_written = True
+        for row in chunk.itertuples(index=False, name=None):
+            ws.append([_xlsx_value(v) for v in row])
+    wb.save(fileobj)
+
+WRITERS = {
+    'csv': _write_csv,
+    'parquet': _write_parquet,
+    'xlsx': _write_xlsx,
+}
+
+def write_chunks(chunks, fileobj, fmt):
+    """Write DataFrame chunks to a binary file object in the given format"""
+    if fmt not in WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    WRITERS[fmt](chunks, fileobj)
+
+def export_to_bytes(df, fmt):
+    """Export an in-memory DataFrame and return the file contents"""
+    fileobj = io.BytesIO()
+    write_chunks(iter_frame_chunks(df), fileobj, fmt)
+    return fileobj.getvalue()
+
+# ==================== CLI ====================
+def _chunk_source(args):
+    def source():
+        return iter_sheet_chunks(args.excel_file, args.sheet, args.chunksize)
+    return source
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export COO dashboard data slices")
+    parser.add_argument('view', choices=['role_reality_latest', 'role_cost_breakdown', 'sheet'],
+                        help="Slice to export")
+    parser.add_argument('-o', '--output', required=True,
+                        help="Output path; format is taken from the extension unless --format is given")
+    parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), help="Output format")
+    parser.add_argument('--excel-file', default=DEFAULT_EXCEL_FILE, help="Source workbook")
+    parser.add_argument('--sheet', default='Role_vs_Reality_Analysis', help="Source sheet name")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip('.').lower()
+    if fmt not in EXPORT_FORMATS:
+        parser.error(f"Cannot infer export format from '{args.output}'; use --format")
+
+    source = _chunk_source(args)
+    if args.view == 'role_reality_latest':
+        chunks = iter_latest_month(source)
+    elif args.view == 'role_cost_breakdown':
+        chunks = [role_cost_breakdown(iter_latest_month(source))]
+    else:
+        chunks = source()
+
+    # Write next to the target and swap in on success so failures leave nothing behind
+    directory = os.path.dirname(os.path.abspath(args.output))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fileobj:
+            write_chunks(chunks, fileobj, fmt)
+        os.replace(tmp_path, args.output)
+    except Exception as e:
+        os.remove(tmp_path)
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {args.output}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Pre-aggregated employee x period heatmap tiles.
+
+Per-employee sheets are pivoted into tiles at one of three zoom levels so
+the browser only receives rows x periods cells for the current view:
+
+    Department  - one row per department
+    Role        - one row per department/role pair, optionally for one department
+    Employee    - individual employees, only within a department (and role)
+"""
+import pandas as pd
+
+HEATMAP_SOURCES = {
+    'Collaboration_Overload': {
+        'value_col': 'Collaboration_Overload_Percentage',
+        'label': 'Collaboration Overload %',
+        'colorscale': 'Reds',
+    },
+    'Hidden_Capacity_Burnout': {
+        'value_col': 'Capacity_Utilization_Percentage',
+        'label': 'Capacity Utilization %',
+        'colorscale': 'RdYlGn_r',
+    },
+}
+ZOOM_LEVELS = ['Department', 'Role', 'Employee']
+ZOOM_KEYS = {
+    'Department': ['Department'],
+    'Role': ['Department', 'Role'],
+    'Employee': ['Department', 'Role', 'Employee_ID'],
+}
+# Upper bound on employee rows sent to the browser at the finest zoom
+DEFAULT_MAX_EMPLOYEES = 200
+
+def _period_labels(periods):
+    """Format period column labels for display"""
+    if pd.api.types.is_datetime64_any_dtype(periods):
+        return periods.strftime('%Y-%m-%d')
+    return periods.astype(str)
+
+def build_heatmap_tiles(df, value_col, zoom, period_col='Month', department=None, role=None,
+                        max_employees=DEFAULT_MAX_EMPLOYEES):
+    """Pivot per-employee rows into (tiles, counts, total_rows) for one zoom level.
+
+    ``tiles`` holds the mean value per row label and period, ``counts`` the
+    number of employee rows behind each cell. Employee zoom keeps the
+    ``max_employees`` rows with the highest average value; ``total_rows`` is
+    the row count before that cut, so callers can tell the view is partial.
+    """
+    if zoom not in ZOOM_KEYS:
+        raise ValueError(f"Unknown zoom level: {zoom}")
+    keys = [k for k in ZOOM_KEYS[zoom] if k in df.columns]
+    required = keys + [period_col, value_col]
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise KeyError(f"Missing columns: {', '.join(missing)}")
+
+    mask = pd.Series(True, index=df.index)
+    if department is not None and 'Department' in df.columns:
+        mask &= df['Department'] == department
+    if role is not None and 'Role' in df.columns:
+        mask &= df['Role'] == role
+    subset = df.loc[mask, required]
+
+    grouped = subset.groupby(keys + [period_col], observed=True, sort=True)
+    tiles = grouped[value_col].mean().unstack(period_col)
+    counts = grouped[value_col].count().unstack(period_col)
+    counts = counts.reindex_like(tiles).fillna(0).astype(int)
+
+    total_rows = len(tiles)
+    if zoom == 'Employee' and total_rows > max_employees:
+        top = tiles.mean(axis=1).nlargest(max_employees).index
+        tiles = tiles.loc[top]
+        counts = counts.loc[top]
+
+    labels = [' / '.join(str(part) for part in (idx if isinstance(idx, tuple) else (idx,)))
+              for idx in tiles.index]
+    tiles.index = labels
+    counts.index = labels
+    tiles.columns = _period_labels(tiles.columns)
+    counts.columns = tiles.columns
+    return tiles, counts, total_rows
@@ -6,6 +6,10 @@ import numpy as np
 from datetime import datetime, timedelta
 import io
 
+from exports import EXPORT_FORMATS, export_to_bytes, role_cost_breakdown
+from heatmaps import HEATMAP_SOURCES, ZOOM_LEVELS, build_heatmap_tiles
+from anomalies import DEFAULT_PARAMS, peek_current_flags
+
 # ==================== PAGE CONFIG ====================
 st.set_page_config(
     page_title="COO Operational Dashboard",
@@ -84,6 +88,13 @@ st.markdown("""
     .trend-up { color: #059669; }
     .trend-down { color: #ef4444; }
     .trend-neutral { color: #6b7280; }
+    
+    .anomaly-flag {
+        font-size: 11px;
+        font-weight: 600;
+        color: #b45309;
+        margin-top: 4px;
+    }
     </style>
 """, unsafe_allow_html=True)
 
@@ -209,6 +220,33 @@ def create_mock_department_data():
     
     return pd.DataFrame(data_list)
 
+@st.cache_data
+def create_mock_workload_data():
+    """Create mock per-employee monthly data for overload and capacity heatmaps"""
+    np.random.seed(44)
+    
+    departments = ['Engineering', 'Sales', 'Finance', 'Operations', 'HR']
+    roles = ['Junior', 'Mid-level', 'Senior', 'Lead', 'Manager']
+    months = pd.date_range('2025-04-01', '2025-09-01', freq='MS')
+    
+    data_list = []
+    for emp_num in range(40):
+        dept = departments[emp_num % len(departments)]
+        role = roles[np.random.randint(len(roles))]
+        base_overload = np.random.uniform(25, 55)
+        base_utilization = np.random.uniform(80, 110)
+        for month in months:
+            data_list.append({
+                'Month': month,
+                'Employee_ID': f"EMP{emp_num + 1:02d}",
+                'Department': dept,
+                'Role': role,
+                'Collaboration_Overload_Percentage': base_overload + np.random.normal(0, 8),
+                'Capacity_Utilization_Percentage': base_utilization + np.random.normal(0, 6)
+            })
+    
+    return pd.DataFrame(data_list)
+
 # ==================== HELPER FUNCTIONS ====================
 def create_improved_sparkline(values, trend_type='neutral'):
     """IMPROVED: Create sparkline with trend-based colors and labels"""
@@ -435,6 +473,69 @@ def create_trend_line_dual_axis(df, x_col, y1_col, y2_col, title):
     
     return fig
 
+def create_tile_heatmap(tiles, counts, title, value_label, colorscale='Reds'):
+    """Create heatmap of pre-aggregated tiles with employee counts on hover"""
+    fig = go.Figure()
+    
+    fig.add_trace(go.Heatmap(
+        z=tiles.values,
+        x=tiles.columns.tolist(),
+        y=tiles.index.tolist(),
+        customdata=counts.values,
+        colorscale=colorscale,
+        colorbar=dict(title=dict(text=value_label, side='right')),
+        hoverongaps=False,
+        hovertemplate='<b>%{y}</b><br>%{x}<br>' + value_label + ': %{z:.1f}<br>Employees: %{customdata}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=dict(text=title, x=0.5, xanchor='center', font=dict(size=16, weight='bold', color='#1f2937')),
+        xaxis_title='',
+        yaxis_title='',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        height=max(300, 22 * len(tiles) + 120),
+        margin=dict(l=20, r=20, t=60, b=60),
+        yaxis=dict(autorange='reversed')
+    )
+    
+    return fig
+
+def render_export_controls(df, name, key):
+    """Render format picker and download button for the currently viewed slice.
+
+    In-app exports cover the in-memory slice on screen; full history goes
+    through the exports.py CLI.
+    """
+    col_fmt, col_prepare, col_download = st.columns([1, 1, 1])
+    with col_fmt:
+        fmt = st.selectbox("Format", list(EXPORT_FORMATS), key=f"export_fmt_{key}", label_visibility='collapsed')
+
+    # Build the file only on request so reruns don't re-export, and keep
+    # at most one prepared payload per session
+    state_key = f"export_file_{key}"
+    with col_prepare:
+        if st.button(f"⬇️ Prepare {name}", key=f"export_prepare_{key}"):
+            for stale_key in [k for k in st.session_state if str(k).startswith('export_file_')]:
+                del st.session_state[stale_key]
+            try:
+                st.session_state[state_key] = (fmt, export_to_bytes(df, fmt))
+            except Exception as e:
+                st.session_state.pop(state_key, None)
+                st.error(f"Error exporting {name}: {str(e)}")
+
+    prepared = st.session_state.get(state_key)
+    with col_download:
+        if prepared and prepared[0] == fmt:
+            st.download_button(
+                f"Download .{fmt}",
+                data=prepared[1],
+                file_name=f"{key}.{fmt}",
+                mime=EXPORT_FORMATS[fmt],
+                key=f"export_download_{key}",
+                use_container_width=True
+            )
+
 # ==================== LOAD DATA ====================
 @st.cache_data
 def load_excel_data():
@@ -444,15 +545,43 @@ def load_excel_data():
         data = {
             'Role_vs_Reality': pd.read_excel(excel_file, sheet_name='Role_vs_Reality_Analysis'),
             'Process_Rework': pd.read_excel(excel_file, sheet_name='Process_Rework_Cost'),
+            'Collaboration_Overload': pd.read_excel(excel_file, sheet_name='Collaboration_Overload'),
+            'Hidden_Capacity_Burnout': pd.read_excel(excel_file, sheet_name='Hidden_Capacity_Burnout'),
         }
         return data
     except FileNotFoundError:
         st.warning("📁 Excel file not found. Using mock data for demonstration.")
+        workload_data = create_mock_workload_data()
         return {
             'Role_vs_Reality': create_mock_role_reality_data(),
             'Process_Rework': create_mock_process_data(),
+            'Collaboration_Overload': workload_data,
+            'Hidden_Capacity_Burnout': workload_data,
         }
 
+@st.cache_data(max_entries=64)
+def get_heatmap_tiles(_df, sheet_key, zoom, department=None, role=None):
+    """Cached heatmap tiles per sheet, zoom level and drill-down filter"""
+    return build_heatmap_tiles(
+        _df,
+        HEATMAP_SOURCES[sheet_key]['value_col'],
+        zoom,
+        department=department,
+        role=role
+    )
+
+@st.cache_data(ttl=300)
+def load_anomaly_flags():
+    """Read current flags, catching up in memory if anomalies.py hasn't run yet"""
+    return peek_current_flags()
+
+def flags_for_series(flags, series):
+    """Filter anomaly flags down to one (sheet, metric) series"""
+    if not series:
+        return []
+    sheet, metric = series
+    return [f for f in flags if f['sheet'] == sheet and f['metric'] == metric]
+
 data = load_excel_data()
 
 # ==================== MAIN APP ====================
@@ -469,16 +598,32 @@ if st.session_state.current_view == 'home':
     # Create three columns for the main objective cards
     cols = st.columns(3)
     
+    try:
+        anomaly_flags, anomaly_state_stale, anomaly_scored = load_anomaly_flags()
+        if not anomaly_scored:
+            st.info(f"🔎 Anomaly flags start once {DEFAULT_PARAMS['window'] + 1} months of history are available.")
+        elif anomaly_state_stale:
+            st.info("🔎 Anomaly state is missing or behind the workbook; flags below were computed in memory. "
+                    "Run `python anomalies.py` to persist them for alerting.")
+        elif not anomaly_flags:
+            st.caption("🔎 No KPI anomalies in the latest month.")
+    except FileNotFoundError:
+        st.info("🔎 Anomaly flags need the Excel workbook and are not available with mock data.")
+        anomaly_flags = []
+    except Exception as e:
+        st.warning(f"Anomaly flags unavailable: {str(e)}")
+        anomaly_flags = []
+    
     objectives = [
         {
             'title': 'Cost & Efficiency',
             'signal': 'Monitor: ROI + Rework + Automation Coverage',
             'key': 'cost',
             'metrics': [
-                {'name': 'Rework Cost %', 'value': '4.3%', 'trend': '+6.7% vs last month', 'trend_type': 'down', 'sparkline': [4.5, 4.2, 4.8, 4.3, 4.1, 4.3]},
-                {'name': 'Automation ROI', 'value': '979%', 'trend': '+101.1% vs last month', 'trend_type': 'up', 'sparkline': [850, 880, 920, 950, 970, 979]},
-                {'name': 'Automation Coverage', 'value': '100%', 'trend': 'Process automation', 'trend_type': 'neutral', 'sparkline': [95, 96, 97, 98, 99, 100]},
-                {'name': 'Digital Index', 'value': '65.7', 'trend': '+31.4% vs last month', 'trend_type': 'up', 'sparkline': [50, 52, 58, 60, 63, 65.7]},
+                {'name': 'Rework Cost %', 'value': '4.3%', 'trend': '+6.7% vs last month', 'trend_type': 'down', 'sparkline': [4.5, 4.2, 4.8, 4.3, 4.1, 4.3], 'series': ('Process_Rework_Cost', 'Rework_Cost_Percentage')},
+                {'name': 'Automation ROI', 'value': '979%', 'trend': '+101.1% vs last month', 'trend_type': 'up', 'sparkline': [850, 880, 920, 950, 970, 979], 'series': ('Automation_ROI_Potential', 'ROI_Percentage_6M')},
+                {'name': 'Automation Coverage', 'value': '100%', 'trend': 'Process automation', 'trend_type': 'neutral', 'sparkline': [95, 96, 97, 98, 99, 100], 'series': None},
+                {'name': 'Digital Index', 'value': '65.7', 'trend': '+31.4% vs last month', 'trend_type': 'up', 'sparkline': [50, 52, 58, 60, 63, 65.7], 'series': ('Digital_Workplace_Index', 'Friction_Index_Score')},
             ]
         },
         {
@@ -486,10 +631,10 @@ if st.session_state.current_view == 'home':
             'signal': 'Monitor: Quality + Reliability + Risk',
             'key': 'execution',
             'metrics': [
-                {'name': 'FTR Rate', 'value': '75.3%', 'trend': '-10.2% vs last month', 'trend_type': 'down', 'sparkline': [80, 78, 76, 75, 74, 75.3]},
-                {'name': 'Process Adherence', 'value': '80.1%', 'trend': '-17.2% vs last month', 'trend_type': 'down', 'sparkline': [90, 88, 85, 82, 80, 80.1]},
-                {'name': 'Resilience Score', 'value': '6.1/10', 'trend': '+0.0% vs last month', 'trend_type': 'neutral', 'sparkline': [6.0, 6.1, 6.0, 6.1, 6.1, 6.1]},
-                {'name': 'Escalations', 'value': '1907', 'trend': '-67.6% vs last month', 'trend_type': 'up', 'sparkline': [2500, 2300, 2100, 2000, 1950, 1907]},
+                {'name': 'FTR Rate', 'value': '75.3%', 'trend': '-10.2% vs last month', 'trend_type': 'down', 'sparkline': [80, 78, 76, 75, 74, 75.3], 'series': ('First_Time_Right_Rate', 'FTR_Rate_Percentage')},
+                {'name': 'Process Adherence', 'value': '80.1%', 'trend': '-17.2% vs last month', 'trend_type': 'down', 'sparkline': [90, 88, 85, 82, 80, 80.1], 'series': ('Process_Adherence_Rate', 'Adherence_Rate_Percentage')},
+                {'name': 'Resilience Score', 'value': '6.1/10', 'trend': '+0.0% vs last month', 'trend_type': 'neutral', 'sparkline': [6.0, 6.1, 6.0, 6.1, 6.1, 6.1], 'series': ('Operational_Resilience_Score', 'Resilience_Score')},
+                {'name': 'Escalations', 'value': '1907', 'trend': '-67.6% vs last month', 'trend_type': 'up', 'sparkline': [2500, 2300, 2100, 2000, 1950, 1907], 'series': ('Escalation_Exception_Patterns', 'Manager_Overrides_Count')},
             ]
         },
         {
@@ -497,10 +642,10 @@ if st.session_state.current_view == 'home':
             'signal': 'Monitor: Output + Capacity + Health',
             'key': 'workforce',
             'metrics': [
-                {'name': 'Output Index', 'value': '8.00', 'trend': '-5.5% vs last month', 'trend_type': 'down', 'sparkline': [8.5, 8.4, 8.3, 8.2, 8.1, 8.0]},
-                {'name': 'Capacity Utilization', 'value': '95%', 'trend': '+4.3% vs last month', 'trend_type': 'up', 'sparkline': [90, 91, 92, 93, 94, 95]},
-                {'name': 'Burnout Risk', 'value': '24', 'trend': 'Burnout risk count', 'trend_type': 'down', 'sparkline': [30, 28, 26, 25, 24, 24]},
-                {'name': 'Model Accuracy', 'value': '85%', 'trend': '+5.5% vs last month', 'trend_type': 'up', 'sparkline': [80, 81, 82, 83, 84, 85]},
+                {'name': 'Output Index', 'value': '8.00', 'trend': '-5.5% vs last month', 'trend_type': 'down', 'sparkline': [8.5, 8.4, 8.3, 8.2, 8.1, 8.0], 'series': ('Work_Models_Effectiveness', 'Productivity_Index')},
+                {'name': 'Capacity Utilization', 'value': '95%', 'trend': '+4.3% vs last month', 'trend_type': 'up', 'sparkline': [90, 91, 92, 93, 94, 95], 'series': ('Hidden_Capacity_Burnout', 'Capacity_Utilization_Percentage')},
+                {'name': 'Burnout Risk', 'value': '24', 'trend': 'Burnout risk count', 'trend_type': 'down', 'sparkline': [30, 28, 26, 25, 24, 24], 'series': ('Hidden_Capacity_Burnout', 'Burnout_Risk_Flag')},
+                {'name': 'Model Accuracy', 'value': '85%', 'trend': '+5.5% vs last month', 'trend_type': 'up', 'sparkline': [80, 81, 82, 83, 84, 85], 'series': ('Capacity_Model_Accuracy', 'Forecast_Accuracy_Percentage')},
             ]
         }
     ]
@@ -529,6 +674,14 @@ if st.session_state.current_view == 'home':
                         <div class="metric-value">{metric['value']}</div>
                         <div class="metric-trend {trend_class}">{metric['trend']}</div>
                     """, unsafe_allow_html=True)
+                    
+                    # Rolling/EWMA anomaly flags on the latest month
+                    metric_flags = flags_for_series(anomaly_flags, metric.get('series'))
+                    if metric_flags:
+                        groups = ', '.join(sorted({f"{f['group']} {'▲' if f['direction'] == 'up' else '▼'}" for f in metric_flags}))
+                        st.markdown(f"""
+                            <div class="anomaly-flag" title="{groups}">⚠️ {len(metric_flags)} anomal{'y' if len(metric_flags) == 1 else 'ies'}: {groups}</div>
+                        """, unsafe_allow_html=True)
                 
                 with col_b:
                     # IMPROVED: Sparkline with trend-based colors
@@ -624,14 +777,11 @@ elif st.session_state.current_view == 'cost':
             
             with col2:
                 try:
-                    if 'Role' in current_data.columns and 'Opportunity_Cost_Monthly' in current_data.columns:
-                        role_cost = current_data.groupby('Role').agg({
-                            'Opportunity_Cost_Monthly': 'sum'
-                        }).sort_values('Opportunity_Cost_Monthly', ascending=True).reset_index()
-                        
+                    role_cost = role_cost_breakdown([current_data])
+                    if not role_cost.empty:
                         fig = create_gradient_horizontal_bar(
                             role_cost,
-                            'Opportunity_Cost_Monthly',
+                            role_cost.columns[1],
                             'Role',
                             "Opportunity Cost by Role"
                         )
@@ -665,6 +815,15 @@ elif st.session_state.current_view == 'cost':
                     st.error("Required columns missing for Trend chart")
             except Exception as e:
                 st.error(f"Error creating Trend chart: {str(e)}")
+            
+            # Export the slices shown above
+            st.markdown("### 📥 Export Data")
+            
+            latest_label = pd.to_datetime(latest_month).strftime('%Y-%m')
+            render_export_controls(current_data, f"Role vs. Reality ({latest_label})", f"role_vs_reality_{latest_label}")
+            role_cost_export = role_cost_breakdown([current_data])
+            if not role_cost_export.empty:
+                render_export_controls(role_cost_export, "Role Cost Breakdown", f"role_cost_breakdown_{latest_label}")
     
     except Exception as e:
         st.error(f"Error loading Cost & Efficiency dashboard: {str(e)}")
@@ -690,6 +849,57 @@ elif st.session_state.current_view == 'workforce':
     with col2:
         st.markdown("## 👥 Workforce & Productivity Dashboard")
     
+    st.markdown("### 🔥 Employee Heatmaps")
+    
+    try:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            sheet_key = st.selectbox("Dataset", list(HEATMAP_SOURCES), format_func=lambda k: k.replace('_', ' '))
+        source = HEATMAP_SOURCES[sheet_key]
+        heatmap_data = data.get(sheet_key, pd.DataFrame())
+        
+        if heatmap_data.empty:
+            st.error("No data available")
+        else:
+            with col2:
+                zoom = st.radio("Zoom", ZOOM_LEVELS, horizontal=True)
+            
+            # Drill-down filters narrow the finer zoom levels
+            department = None
+            role = None
+            if zoom != 'Department' and 'Department' in heatmap_data.columns:
+                departments = sorted(heatmap_data['Department'].dropna().unique())
+                with col3:
+                    options = departments if zoom == 'Employee' else ['All'] + departments
+                    selected = st.selectbox("Department", options)
+                department = None if selected == 'All' else selected
+            if zoom == 'Employee' and 'Role' in heatmap_data.columns:
+                roles = sorted(heatmap_data.loc[heatmap_data['Department'] == department, 'Role'].dropna().unique())
+                with col4:
+                    selected = st.selectbox("Role", ['All'] + roles)
+                role = None if selected == 'All' else selected
+            
+            tiles, counts, total_rows = get_heatmap_tiles(heatmap_data, sheet_key, zoom, department, role)
+            
+            if tiles.empty:
+                st.info("No rows match the selected filters")
+            else:
+                title = f"{source['label']} by {zoom}"
+                if department:
+                    title += f" — {department}"
+                if role:
+                    title += f" / {role}"
+                if total_rows > len(tiles):
+                    title += f" (top {len(tiles)} of {total_rows} employees)"
+                    st.caption(f"Showing the {len(tiles)} employees with the highest average "
+                               f"{source['label']} out of {total_rows}. Pick a role to narrow the view.")
+                fig = create_tile_heatmap(tiles, counts, title, source['label'], source['colorscale'])
+                st.plotly_chart(fig, use_container_width=True)
+    
+    except Exception as e:
+        st.error(f"Error creating heatmap: {str(e)}")
+        st.info("Please check that your data file has the required columns.")
+    
     st.info("📊 Coming soon: Output, capacity, and health metrics")
 
 # ==================== FOOTER ====================